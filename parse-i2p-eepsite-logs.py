@@ -1,103 +1,253 @@
+import html
+import mmap
 import os
 import re
 from collections import Counter, defaultdict
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
 
-def parse_log_line(line):
-    """Parse a log line to extract the visiting router, date, request, and status code."""
+# Cache of parsed timestamps keyed by the raw date bytes; log lines often share a timestamp
+_DATE_CACHE = {}
+_DATE_CACHE_MAX_SIZE = 100_000
+
+# Number of parsed entries counted per batch in count_log_entries
+_STATS_CHUNK_SIZE = 65536
+
+# Router address of requests made by the local machine, left out of the visiting routers
+_LOCALHOST = b'127.0.0.1'
+
+# Requests and file extensions left out of the most requested pages
+_IGNORED_REQUESTS = frozenset({b'GET /', b'GET /styles.css', b'GET /favicon.png', b'HEAD /'})
+_IGNORED_EXTENSIONS = (b'.png', b'.ico', b'.css')
+
+# Pattern capturing the router, date, request and status code of a raw log line in a single pass;
+# no field can span a newline, so it can also be run over a whole file to find every line.
+# Blanks before the router are skipped so indented lines count towards the same router
+_LINE_PATTERN = re.compile(rb'^[ \t]*(.*?) -  -  \[([^ \]\n]+)[^\]\n]*\] "([^"\n]*)" (\S+)', re.MULTILINE)
+
+def _decode(value):
+    """Decode a raw log field for display."""
+    return value.decode('utf-8', 'replace')
+
+def parse_log_date(date):
+    """Parse a log timestamp, reusing the result for timestamps that have been seen before."""
+    parsed_date = _DATE_CACHE.get(date)
+    if parsed_date is None:
+        parsed_date = datetime.strptime(date.decode('ascii'), "%d/%b/%Y:%H:%M:%S")
+        if len(_DATE_CACHE) >= _DATE_CACHE_MAX_SIZE:
+            # Start over rather than evicting one entry at a time: deleting from the front
+            # of a dict leaves dead slots that every later eviction would have to skip
+            _DATE_CACHE.clear()
+        _DATE_CACHE[date] = parsed_date
+    return parsed_date
+
+def _entry_from_match(match):
+    """Build a (router, date, request, status_code) tuple from a _LINE_PATTERN match."""
+    router, date, request, status_code = match.groups()
     try:
-        # Extract the visiting router
-        router = line.split(' -  -  [')[0]
-        
-        # Extract the date
-        date = line.split('[')[1].split(' +')[0]
-        
-        # Extract the request
-        request = line.split('"')[1]
-        
-        # Extract the status code
-        status_code = line.split('" ')[1].split(' -')[0]
-        
-        return {
-            "router": router,
-            "date": datetime.strptime(date, "%d/%b/%Y:%H:%M:%S"),
-            "request": request,
-            "status_code": status_code
-        }
-    except (IndexError, ValueError):
-        # Return None if the line is not in the expected format
+        return (router, parse_log_date(date), request, status_code)
+    except ValueError:
         return None
 
+def find_log_files(directory):
+    """Yield the paths of all log files in the specified directory and its subdirectories."""
+    try:
+        with os.scandir(directory) as scanner:
+            entries = list(scanner)
+    except OSError:
+        # Skip directories that cannot be listed, as os.walk does
+        return
+
+    # scandir already knows each entry's type, so no extra stat() per file is needed
+    subdirectories = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirectories.append(entry.path)
+        elif entry.name.lower().endswith('.log') and entry.is_file():
+            yield entry.path
+
+    for subdirectory in subdirectories:
+        yield from find_log_files(subdirectory)
+
+def _iter_line_matches(file_path):
+    """Yield a _LINE_PATTERN match for every well-formed line of a log file."""
+    with open(file_path, 'rb') as log_file:
+        if os.fstat(log_file.fileno()).st_size == 0:
+            # Empty files cannot be memory-mapped
+            return
+
+        # Scan the memory-mapped file directly with the multiline pattern: no per-line
+        # buffers are copied, and only the captured fields become bytes objects. A file
+        # truncated while it is mapped (e.g. copytruncate log rotation) crashes the worker
+        # with SIGBUS, so don't run the report while the router is rotating its logs
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_data:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                # Let the kernel read ahead aggressively since the file is scanned front to back
+                log_data.madvise(mmap.MADV_SEQUENTIAL)
+            yield from _LINE_PATTERN.finditer(log_data)
+
+def iter_log_entries(file_path):
+    """Yield parsed entries from a single log file."""
+    for match in _iter_line_matches(file_path):
+        parsed_line = _entry_from_match(match)
+        if parsed_line:
+            yield parsed_line
+
+def count_log_entries(log_entries):
+    """Tally the routers, requests and timestamps of (router, date, request, status_code) entries."""
+    # Count the raw columns with Counter.update, which tallies in C; the per-key
+    # statistics then only have to visit each distinct value once
+    router_requests = Counter()
+    request_counts = Counter()
+    date_counts = Counter()
+    total_entries = 0
+
+    log_entries = iter(log_entries)
+    while True:
+        chunk = list(islice(log_entries, _STATS_CHUNK_SIZE))
+        if not chunk:
+            break
+        total_entries += len(chunk)
+        routers, dates, requests, _ = zip(*chunk)
+        router_requests.update(routers)
+        request_counts.update(requests)
+        date_counts.update(dates)
+
+    # Ignore requests made by '127.0.0.1'; dropping it here rather than per entry costs a
+    # single lookup and keeps it out of the tallies merged by parse_log_files
+    router_requests.pop(_LOCALHOST, None)
+
+    return router_requests, request_counts, date_counts, total_entries
+
+def count_log_file(file_path):
+    """Tally the parsed entries of a single log file."""
+    # The log format is fixed, so tally the raw regex fields directly (groups() is called
+    # from C via map) and parse each distinct timestamp once afterwards, instead of
+    # building a parsed entry for every line
+    router_requests, request_counts, raw_date_counts, total_entries = count_log_entries(
+        map(re.Match.groups, _iter_line_matches(file_path))
+    )
+
+    date_counts = Counter()
+    try:
+        for date, count in raw_date_counts.items():
+            date_counts[parse_log_date(date)] += count
+    except ValueError:
+        # Lines with a malformed timestamp must be skipped entirely, so fall back to
+        # parsing this file entry by entry
+        return count_log_entries(iter_log_entries(file_path))
+
+    return router_requests, request_counts, date_counts, total_entries
+
+def _merge_log_counts(file_counts):
+    """Merge per-file tallies, in file order so ties rank the same as a sequential parse."""
+    router_requests = Counter()
+    request_counts = Counter()
+    date_counts = Counter()
+    total_entries = 0
+
+    for routers, requests, dates, entries in file_counts:
+        router_requests.update(routers)
+        request_counts.update(requests)
+        date_counts.update(dates)
+        total_entries += entries
+
+    return router_requests, request_counts, date_counts, total_entries
+
 def parse_log_files(directory):
-    """Parse all log files in the specified directory."""
-    log_entries = []
-    log_pattern = re.compile(r'.*\.log$', re.IGNORECASE)  # Pattern to match .log files
-
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if log_pattern.match(file):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r') as log_file:
-                    for line in log_file:
-                        parsed_line = parse_log_line(line.strip())
-                        if parsed_line:
-                            log_entries.append(parsed_line)
-
-    return log_entries
-
-def generate_statistics(log_entries):
-    """Generate useful statistics from the parsed log entries."""
-    # Count requests by router (ignoring '127.0.0.1')
-    router_requests = Counter(entry['router'] for entry in log_entries if entry['router'] != '127.0.0.1')
-    top_50_routers = router_requests.most_common(50)
+    """Parse all log files in the specified directory, spreading the files across CPU cores."""
+    file_paths = list(find_log_files(directory))
+
+    if hasattr(os, 'sched_getaffinity'):
+        cpu_count = len(os.sched_getaffinity(0))  # Cores this process may actually run on
+    else:
+        cpu_count = os.cpu_count() or 1
+
+    if len(file_paths) <= 1 or cpu_count == 1:
+        # Worker processes only pay off with several files and cores; otherwise starting
+        # them and pickling the per-file tallies back is pure overhead
+        return _merge_log_counts(map(count_log_file, file_paths))
+
+    with ProcessPoolExecutor() as executor:
+        return _merge_log_counts(executor.map(count_log_file, file_paths))
+
+def generate_statistics(log_counts):
+    """Generate useful statistics from the tallied log entries."""
+    router_requests, request_counts, date_counts, total_entries = log_counts
+
+    current_date = datetime.now()
+    # Integer month index (year * 12 + month - 1) before the last 56 months, including the current one
+    fifty_six_months_ago = current_date.year * 12 + current_date.month - 1 - 56
 
     # Count requests for .html pages
-    html_requests = [entry for entry in log_entries if ".html" in entry['request']]
-    total_html_requests = len(html_requests)
+    total_html_requests = sum(count for request, count in request_counts.items() if b".html" in request)
 
-    # Define a set of requests to ignore
-    ignored_requests = {'GET /', 'GET /styles.css', 'GET /favicon.png', 'HEAD /'}
-    
     # Count most requested pages (ignoring .png, .ico, .css requests and specified ignored requests)
-    page_requests = Counter(
-        entry['request'] for entry in log_entries 
-        if not (entry['request'].endswith(('.png', '.ico', '.css')) or entry['request'] in ignored_requests)
-    )
-    top_50_pages = page_requests.most_common(50)
+    page_requests = Counter({
+        request: count for request, count in request_counts.items()
+        if not (request in _IGNORED_REQUESTS or request.endswith(_IGNORED_EXTENSIONS))
+    })
 
-    # Calculate average requests per month for the last 56 months
-    current_date = datetime.now()
-    fifty_six_months_ago = current_date - timedelta(days=56 * 30)  # Approximation of 56 months
+    # Count requests per month for the last 56 months, and requests per hour of the day
     monthly_requests = defaultdict(int)
+    hours = [0] * 24  # Fixed-size histogram indexed by hour, no hashing needed
+    # Timestamps arrive in log order, which is normally chronological, so months come in
+    # long runs; accumulate each run locally and only write to the dict when the month changes
+    run_month = None
+    run_count = 0
+    for date, count in date_counts.items():
+        # Bucket by an integer month index and only format the distinct months afterwards
+        month = date.year * 12 + date.month - 1
+        if month == run_month:
+            run_count += count
+        else:
+            if run_month is not None and run_month > fifty_six_months_ago:
+                monthly_requests[run_month] += run_count
+            run_month = month
+            run_count = count
+        hours[date.hour] += count
+    if run_month is not None and run_month > fifty_six_months_ago:
+        monthly_requests[run_month] += run_count
 
-    for entry in log_entries:
-        if entry['date'] > fifty_six_months_ago:
-            month = entry['date'].strftime("%Y-%m")
-            monthly_requests[month] += 1
+    top_50_routers = [(_decode(router), count) for router, count in router_requests.most_common(50)]
+    top_50_pages = [(_decode(page), count) for page, count in page_requests.most_common(50)]
 
     # Average page loads per month for the last 56 months
     total_months = len(monthly_requests)
     average_page_loads_per_month = sum(monthly_requests.values()) / total_months if total_months > 0 else 0
 
     # Most popular hour of the day
-    hours = [entry['date'].hour for entry in log_entries]
-    popular_hour = Counter(hours).most_common(1)[0][0] if hours else None
+    popular_hour = max(range(24), key=hours.__getitem__) if date_counts else None
 
     # Last update date and time
     last_update = current_date.strftime("%d/%b/%Y %H:%M:%S")
 
     return {
+        "total_entries": total_entries,
         "top_50_routers": top_50_routers,
         "total_html_requests": total_html_requests,
         "top_50_pages": top_50_pages,
         "average_page_loads_per_month": average_page_loads_per_month,
-        "monthly_requests": sorted(monthly_requests.items()),
+        "monthly_requests": [
+            (f"{month // 12}-{month % 12 + 1:02d}", count) for month, count in sorted(monthly_requests.items())
+        ],
         "most_popular_time": popular_hour,
         "last_update": last_update
     }
 
+def _table_rows(items):
+    """Render (label, count) pairs as HTML table rows, escaping the log-supplied labels."""
+    rows = [f"<tr><td>{html.escape(str(label))}</td><td>{count}</td></tr>" for label, count in items]
+    return "".join(rows)
+
 def generate_html_report(statistics, output_file='report.html'):
     """Generate an HTML report with the given statistics."""
+    # Build each table body once up front rather than inside the page template
+    monthly_rows = _table_rows(statistics['monthly_requests'])
+    router_rows = _table_rows(statistics['top_50_routers'])
+    page_rows = _table_rows(statistics['top_50_pages'])
+
     html_content = f"""
     <!DOCTYPE html>
     <html lang="en">
@@ -152,7 +302,7 @@ def generate_html_report(statistics, output_file='report.html'):
                 </tr>
             </thead>
             <tbody>
-                {''.join(f"<tr><td>{month}</td><td>{count}</td></tr>" for month, count in statistics['monthly_requests'])}
+                {monthly_rows}
             </tbody>
         </table>
 
@@ -168,7 +318,7 @@ def generate_html_report(statistics, output_file='report.html'):
                 </tr>
             </thead>
             <tbody>
-                {''.join(f"<tr><td>{router}</td><td>{count}</td></tr>" for router, count in statistics['top_50_routers'])}
+                {router_rows}
             </tbody>
         </table>
         <h2>Top 50 Most Requested Pages</h2>
@@ -180,7 +330,7 @@ def generate_html_report(statistics, output_file='report.html'):
                 </tr>
             </thead>
             <tbody>
-                {''.join(f"<tr><td>{page}</td><td>{count}</td></tr>" for page, count in statistics['top_50_pages'])}
+                {page_rows}
             </tbody>
         </table>
 
@@ -208,12 +358,12 @@ def main():
     
     # Parse log files
     print(f"Parsing log files in '{directory}'...")
-    log_entries = parse_log_files(directory)
-    
-    if log_entries:
-        # Generate statistics
-        statistics = generate_statistics(log_entries)
-        
+    log_counts = parse_log_files(directory)
+
+    # Generate statistics
+    statistics = generate_statistics(log_counts)
+
+    if statistics['total_entries']:
         # Generate HTML report
         generate_html_report(statistics)
     else: